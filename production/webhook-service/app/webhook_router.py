@@ -1,19 +1,124 @@
-from flask import Flask, request, jsonify
-import requests
-import json
 import os
+
+# Patch blocking IO before anything else is imported so outbound AgentAPI
+# calls yield cooperatively and webhooks are served concurrently
+USE_GEVENT = os.getenv('USE_GEVENT', 'true').lower() == 'true'
+if USE_GEVENT:
+    from gevent import monkey
+    monkey.patch_all()
+    from gevent.pool import Pool
+
+from flask import Flask, request
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 import logging
-from typing import Dict, Optional, List
-import re
-from dataclasses import dataclass
+import string
+import hashlib
+import threading
+from typing import Dict, Optional, List, FrozenSet, Tuple
+from fnmatch import fnmatchcase
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; an unknown LOG_LEVEL falls back to INFO instead of failing at import
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+_log_level = logging.getLevelName(LOG_LEVEL)
+logging.basicConfig(level=_log_level if isinstance(_log_level, int) else logging.INFO)
 logger = logging.getLogger(__name__)
+if not isinstance(_log_level, int):
+    logger.warning("Invalid LOG_LEVEL %r, using INFO", LOG_LEVEL)
+
+# Shared read-only default for missing nested JIRA fields; never mutate
+_EMPTY = {}
+
+# Environment settings that stay fixed for the lifetime of the process
+JIRA_BASE_URL = os.getenv('JIRA_BASE_URL', 'https://your-jira.atlassian.net').rstrip('/')
+PORT = int(os.getenv('PORT', 5000))
+DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
+WATCH_CONFIG = os.getenv('WATCH_CONFIG', 'true').lower() == 'true'
 
 app = Flask(__name__)
 
+def _json(payload, status=200):
+    """Build a JSON response using orjson instead of Flask's stdlib-based jsonify"""
+    return app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
+
+def _request_json():
+    """Parse the request body with orjson, returning None when it is empty"""
+    body = request.get_data(cache=False)
+    return orjson.loads(body) if body else None
+
+# Shared HTTP session so AgentAPI connections are pooled and kept alive
+# across webhooks instead of being re-established on every request.
+# Status probes are retried on gateway errors; POST /message is only retried on
+# connect errors (the request was never sent), so a slow AgentAPI never receives
+# the same prompt twice. The final response is returned rather than raised so
+# callers still see the real status code.
+SESSION = requests.Session()
+SESSION.headers.update({'Content-Type': 'application/json'})
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False
+    )
+)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# Optional HTTP/2 client that multiplexes concurrent AgentAPI calls over a single
+# connection per host. HTTP/2 is negotiated via TLS, so it only applies to https URLs.
+AGENTAPI_HTTP2 = os.getenv('AGENTAPI_HTTP2', 'false').lower() == 'true'
+AGENTAPI_ERRORS = (requests.exceptions.RequestException,)
+CLIENT = None
+if AGENTAPI_HTTP2:
+    import httpx
+    CLIENT = httpx.Client(
+        http2=True,
+        timeout=30.0,
+        headers={'Content-Type': 'application/json'},
+        limits=httpx.Limits(max_keepalive_connections=64, max_connections=128)
+    )
+    AGENTAPI_ERRORS += (httpx.HTTPError,)
+
+# Constant parts of the AgentAPI message body; only the prompt is encoded per call
+_PROMPT_PREFIX = b'{"content":"'
+_PROMPT_SUFFIX = b'","type":"user"}'
+
+def _envelope(prompt) -> bytes:
+    """Encode an AgentAPI user message without building and serializing a dict"""
+    if not isinstance(prompt, str):
+        # Manual triggers may pass arbitrary JSON; encode those the general way
+        return orjson.dumps({"content": prompt, "type": "user"})
+    # orjson encodes a str as a quoted JSON string; strip the quotes
+    return _PROMPT_PREFIX + orjson.dumps(prompt)[1:-1] + _PROMPT_SUFFIX
+
+def _post_message(agentapi_url: str, body: bytes):
+    """POST an encoded message to an AgentAPI instance"""
+    if CLIENT is not None:
+        return CLIENT.post(f"{agentapi_url}/message", content=body)
+    return SESSION.post(f"{agentapi_url}/message", data=body, timeout=30)
+
+def _get_status(agentapi_url: str):
+    """GET the status of an AgentAPI instance"""
+    if CLIENT is not None:
+        return CLIENT.get(f"{agentapi_url}/status", timeout=10)
+    return SESSION.get(f"{agentapi_url}/status", timeout=10)
+
 @dataclass
 class ProjectRoute:
     name: str
@@ -21,20 +126,98 @@ class ProjectRoute:
     agentapi_url: str
     jira_projects: List[str]
     enabled: bool = True
+    literal_projects: FrozenSet[str] = field(init=False, repr=False)
+    patterns: List[str] = field(init=False, repr=False)
+    has_star: bool = field(init=False, repr=False)
+
+    def __post_init__(self):
+        """Split project keys into literals and wildcard patterns once, at load time"""
+        self.literal_projects = frozenset(
+            p.upper() for p in self.jira_projects if '*' not in p and '?' not in p
+        )
+        self.has_star = '*' in self.jira_projects
+        self.patterns = [
+            p.upper() for p in self.jira_projects
+            if p != '*' and ('*' in p or '?' in p)
+        ]
+
+    def matches_pattern(self, project_key: str) -> bool:
+        """Check if an upper-cased project key matches any wildcard pattern of this route"""
+        if self.has_star:
+            return True
+        for pattern in self.patterns:
+            if fnmatchcase(project_key, pattern):
+                return True
+        return False
+
+# Maximum number of resolved project keys kept by WebhookRouter
+ROUTE_CACHE_SIZE = 4096
+
+def _index_route(route: ProjectRoute, literal_index: Dict[str, ProjectRoute], pattern_routes: List[ProjectRoute]):
+    """Add an enabled route to the literal project index and pattern list"""
+    if not route.enabled:
+        return
+    # First route listing a project key wins, matching config order
+    for project_key in route.literal_projects:
+        literal_index.setdefault(project_key, route)
+    if route.has_star or route.patterns:
+        pattern_routes.append(route)
+
+@dataclass(frozen=True)
+class RoutingState:
+    """Routing tables from a single config load, replaced as one reference on reload"""
+    routes: Dict[str, ProjectRoute] = field(default_factory=dict)
+    literal_index: Dict[str, ProjectRoute] = field(default_factory=dict)
+    pattern_routes: Tuple[ProjectRoute, ...] = ()
+    catch_all_route: Optional[ProjectRoute] = None
+    # Resolved routes for this configuration; discarded with the state on reload
+    route_cache: Dict[str, Optional[ProjectRoute]] = field(default_factory=dict)
 
 class WebhookRouter:
     def __init__(self, config_path: str = '/config/routing.yaml'):
         self.config_path = config_path
-        self.routes: Dict[str, ProjectRoute] = {}
-        self.catch_all_route: Optional[ProjectRoute] = None
+        self.state = RoutingState()
+        # Set once a RoutingState has been published; later load errors keep it
+        self._state_published = False
+        self._config_signature: Optional[Tuple[int, int, int]] = None
+        # Serializes watcher and /config/reload loads so an older parse can't publish last
+        self._load_lock = threading.Lock()
         self.load_config()
 
-    def load_config(self):
-        """Load routing configuration from YAML file"""
+    @property
+    def routes(self) -> Dict[str, ProjectRoute]:
+        return self.state.routes
+
+    @property
+    def catch_all_route(self) -> Optional[ProjectRoute]:
+        return self.state.catch_all_route
+
+    def load_config(self, force: bool = False):
+        """Load routing configuration from YAML file, skipping it if unchanged unless forced"""
+        with self._load_lock:
+            self._load_config_locked(force)
+
+    def _load_config_locked(self, force: bool):
+        """Stat, parse and publish the routing configuration; caller holds _load_lock"""
+        # Build the new routing tables locally and publish them as a single
+        # RoutingState so in-flight requests never observe a half-loaded router
+        routes: Dict[str, ProjectRoute] = {}
+        literal_index: Dict[str, ProjectRoute] = {}
+        pattern_routes: List[ProjectRoute] = []
+        catch_all_route: Optional[ProjectRoute] = None
+        signature: Optional[Tuple[int, int, int]] = None
+        
         try:
             if os.path.exists(self.config_path):
+                # Skip the parse and index rebuild when the file hasn't changed
+                st = os.stat(self.config_path)
+                signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+                if not force and signature == self._config_signature:
+                    logger.debug("Config file unchanged, skipping reload: %s", self.config_path)
+                    return
+                
                 with open(self.config_path, 'r') as f:
-                    config = yaml.safe_load(f)
+                    config = yaml.load(f, Loader=SafeLoader)
                     
                 # Load project routes
                 for route_config in config.get('routes', []):
@@ -45,92 +228,164 @@ class WebhookRouter:
                         jira_projects=route_config.get('jira_projects', []),
                         enabled=route_config.get('enabled', True)
                     )
-                    self.routes[route.name] = route
-                    logger.info(f"Loaded route for project: {route.name}")
+                    if route.name in routes:
+                        logger.warning("Duplicate route name %s; later definition replaces earlier one", route.name)
+                    routes[route.name] = route
+                    logger.info("Loaded route for project: %s", route.name)
+                
+                # Index only the routes that survived name de-duplication
+                for route in routes.values():
+                    _index_route(route, literal_index, pattern_routes)
                 
                 # Load catch-all route
                 catch_all_config = config.get('catch_all')
                 if catch_all_config:
-                    self.catch_all_route = ProjectRoute(
+                    catch_all_route = ProjectRoute(
                         name=catch_all_config['name'],
                         namespace=catch_all_config['namespace'],
                         agentapi_url=catch_all_config['agentapi_url'],
                         jira_projects=['*'],
                         enabled=catch_all_config.get('enabled', True)
                     )
-                    logger.info(f"Loaded catch-all route: {self.catch_all_route.name}")
+                    logger.info("Loaded catch-all route: %s", catch_all_route.name)
                     
-                logger.info(f"Loaded {len(self.routes)} project routes and catch-all route")
+                logger.info("Loaded %s project routes and catch-all route", len(routes))
             else:
-                logger.warning(f"Config file not found: {self.config_path}. Using environment variables.")
-                self._load_from_env()
+                logger.warning("Config file not found: %s. Using environment variables.", self.config_path)
+                catch_all_route = self._load_from_env()
                 
         except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            self._load_from_env()
+            # Leave the signature unset so the next file event retries the load
+            self._config_signature = None
+            if self._state_published:
+                logger.error("Error loading config, keeping previous configuration: %s", e)
+                return
+            logger.error("Error loading config: %s", e)
+            # Never publish partially parsed routes without their index
+            routes, literal_index, pattern_routes = {}, {}, []
+            signature = None
+            catch_all_route = self._load_from_env()
+        
+        self.state = RoutingState(
+            routes=routes,
+            literal_index=literal_index,
+            pattern_routes=tuple(pattern_routes),
+            catch_all_route=catch_all_route
+        )
+        self._config_signature = signature
+        self._state_published = True
 
-    def _load_from_env(self):
+    def _load_from_env(self) -> Optional[ProjectRoute]:
         """Fallback to environment variables for configuration"""
         default_url = os.getenv('DEFAULT_AGENTAPI_URL', 'http://claude-dev-env-service.claude-dev.svc.cluster.local:3284')
         default_namespace = os.getenv('DEFAULT_NAMESPACE', 'claude-dev')
         
         if default_url:
-            self.catch_all_route = ProjectRoute(
+            logger.info("Using default catch-all route from environment: %s", default_url)
+            return ProjectRoute(
                 name='default',
                 namespace=default_namespace,
                 agentapi_url=default_url,
                 jira_projects=['*'],
                 enabled=True
             )
-            logger.info(f"Using default catch-all route from environment: {default_url}")
+        return None
 
     def find_route_for_project(self, jira_project_key: str) -> Optional[ProjectRoute]:
         """Find the appropriate route for a JIRA project"""
+        # Read the state once so the lookup, resolve and cache write all use one config
+        state = self.state
+        cache = state.route_cache
+        try:
+            return cache[jira_project_key]
+        except KeyError:
+            pass
+        
+        route = self._resolve_route(state, jira_project_key)
+        # Project keys are low-cardinality; reset rather than grow without bound
+        if len(cache) >= ROUTE_CACHE_SIZE:
+            cache.clear()
+        cache[jira_project_key] = route
+        return route
+
+    def _resolve_route(self, state: RoutingState, jira_project_key: str) -> Optional[ProjectRoute]:
+        """Resolve the route for a JIRA project without consulting the cache"""
         
         # First, check for exact project matches
-        for route in self.routes.values():
-            if not route.enabled:
-                continue
-            if jira_project_key in route.jira_projects:
-                logger.info(f"Found exact match for project {jira_project_key}: {route.name}")
-                return route
+        project_key_upper = jira_project_key.upper()
+        route = state.literal_index.get(project_key_upper)
+        if route:
+            logger.debug("Found exact match for project %s: %s", jira_project_key, route.name)
+            return route
         
         # Then, check for pattern matches (e.g., "PROJ-*" matches "PROJ-123")
-        for route in self.routes.values():
-            if not route.enabled:
-                continue
-            for pattern in route.jira_projects:
-                if self._match_pattern(pattern, jira_project_key):
-                    logger.info(f"Found pattern match for project {jira_project_key}: {route.name} (pattern: {pattern})")
-                    return route
+        for route in state.pattern_routes:
+            if route.matches_pattern(project_key_upper):
+                logger.debug("Found pattern match for project %s: %s", jira_project_key, route.name)
+                return route
         
         # Finally, use catch-all route if available
-        if self.catch_all_route and self.catch_all_route.enabled:
-            logger.info(f"Using catch-all route for project {jira_project_key}: {self.catch_all_route.name}")
-            return self.catch_all_route
+        catch_all_route = state.catch_all_route
+        if catch_all_route and catch_all_route.enabled:
+            logger.debug("Using catch-all route for project %s: %s", jira_project_key, catch_all_route.name)
+            return catch_all_route
         
-        logger.warning(f"No route found for project: {jira_project_key}")
+        logger.warning("No route found for project: %s", jira_project_key)
         return None
 
-    def _match_pattern(self, pattern: str, project_key: str) -> bool:
-        """Check if project key matches pattern (supports wildcards)"""
-        if pattern == '*':
-            return True
-        
-        # Convert wildcard pattern to regex
-        regex_pattern = pattern.replace('*', '.*').replace('?', '.')
-        return bool(re.match(f'^{regex_pattern}$', project_key, re.IGNORECASE))
-
-    def reload_config(self):
+    def reload_config(self, force: bool = False):
         """Reload configuration (useful for config updates)"""
         logger.info("Reloading configuration...")
-        self.routes.clear()
-        self.catch_all_route = None
-        self.load_config()
+        self.load_config(force=force)
+
+class ConfigWatcher(FileSystemEventHandler):
+    """Reload routing configuration when files in the config directory change"""
+
+    def __init__(self, router: WebhookRouter, debounce: float = 0.5):
+        self.router = router
+        self.debounce = debounce
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def on_any_event(self, event):
+        # A single save (or ConfigMap symlink swap) fires several events; coalesce them
+        if event.event_type not in ('created', 'modified', 'moved', 'deleted'):
+            return
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.router.reload_config)
+            self._timer.daemon = True
+            self._timer.start()
+
+def start_config_watcher(router: WebhookRouter):
+    """Start watching the routing config directory, returning the observer"""
+    config_dir = os.path.dirname(router.config_path)
+    if not os.path.isdir(config_dir):
+        logger.warning("Config directory not found: %s. Not watching for changes.", config_dir)
+        return None
+    
+    # inotify reads block the whole gevent hub, so poll when running under gevent
+    observer = PollingObserver() if USE_GEVENT else Observer()
+    observer.schedule(ConfigWatcher(router), config_dir, recursive=False)
+    observer.daemon = True
+    observer.start()
+    logger.info("Watching %s for configuration changes", config_dir)
+    return observer
 
 # Global router instance
 router = WebhookRouter()
 
+# Background pool delivering prompts to AgentAPI, with counters for /metrics
+_DISPATCH = ThreadPoolExecutor(max_workers=16)
+_dispatch_lock = threading.Lock()
+_dispatch_stats = {"pending": 0, "delivered": 0, "failed": 0, "deduped": 0}
+
+# Recently dispatched (ticket, prompt fingerprint) pairs; JIRA often fires
+# several identical webhooks for one ticket within seconds
+_RECENT = TTLCache(maxsize=4096, ttl=5.0)
+_recent_lock = threading.Lock()
+
 # Claude prompt templates
 CLAUDE_PROMPT_TEMPLATES = {
     'issue_created': """
@@ -192,37 +447,69 @@ Ticket URL: {ticket_url}
 """
 }
 
+def _compile_template(template: str):
+    """Parse a prompt template, allowing only bare field names without conversions"""
+    parts = list(string.Formatter().parse(template))
+    for _, name, _, conversion in parts:
+        if name is None:
+            continue
+        # _render_template only looks up plain keys; reject anything str.format would treat differently
+        if not name.isidentifier() or conversion is not None:
+            raise ValueError(f"Unsupported prompt template field: {{{name}{'!' + conversion if conversion else ''}}}")
+    return parts
+
+# Pre-parse prompt templates once so rendering doesn't re-tokenize them on every webhook
+_COMPILED_TEMPLATES = {
+    key: _compile_template(template)
+    for key, template in CLAUDE_PROMPT_TEMPLATES.items()
+}
+
+def _render_template(parts, context):
+    """Render a pre-parsed prompt template with ticket information"""
+    return ''.join(
+        literal + (format(context[name], spec) if name is not None else '')
+        for literal, name, spec, _ in parts
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    state = router.state
+    return _json({
         "status": "healthy",
-        "routes_loaded": len(router.routes),
-        "catch_all_enabled": router.catch_all_route is not None
+        "routes_loaded": len(state.routes),
+        "catch_all_enabled": state.catch_all_route is not None
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Background delivery queue metrics"""
+    with _dispatch_lock:
+        return _json(dict(_dispatch_stats))
+
 @app.route('/config/reload', methods=['POST'])
 def reload_config():
     """Reload configuration endpoint"""
     try:
-        router.reload_config()
-        return jsonify({
+        router.reload_config(force=True)
+        return _json({
             "status": "success",
             "message": "Configuration reloaded",
             "routes_loaded": len(router.routes)
         })
     except Exception as e:
-        return jsonify({
+        return _json({
             "status": "error",
             "message": str(e)
-        }), 500
+        }, 500)
 
 @app.route('/routes', methods=['GET'])
 def list_routes():
     """List all configured routes"""
+    state = router.state
     routes_info = []
     
-    for route in router.routes.values():
+    for route in state.routes.values():
         routes_info.append({
             "name": route.name,
             "namespace": route.namespace,
@@ -232,211 +519,239 @@ def list_routes():
         })
     
     catch_all_info = None
-    if router.catch_all_route:
+    if state.catch_all_route:
         catch_all_info = {
-            "name": router.catch_all_route.name,
-            "namespace": router.catch_all_route.namespace,
-            "agentapi_url": router.catch_all_route.agentapi_url,
-            "enabled": router.catch_all_route.enabled
+            "name": state.catch_all_route.name,
+            "namespace": state.catch_all_route.namespace,
+            "agentapi_url": state.catch_all_route.agentapi_url,
+            "enabled": state.catch_all_route.enabled
         }
     
-    return jsonify({
+    return _json({
         "routes": routes_info,
         "catch_all": catch_all_info
     })
 
+def _deliver(route: ProjectRoute, prompt: str, ticket_key: str):
+    """Send a rendered prompt to AgentAPI and record the outcome"""
+    outcome = "failed"
+    try:
+        response = _post_message(route.agentapi_url, _envelope(prompt))
+        
+        if response.status_code == 200:
+            outcome = "delivered"
+            logger.info("Successfully sent webhook to %s for ticket %s", route.name, ticket_key)
+        else:
+            logger.error("Failed to send to AgentAPI: %s - %s", response.status_code, response.text)
+            
+    except AGENTAPI_ERRORS as e:
+        logger.error("Request failed to %s: %s", route.agentapi_url, e)
+    except Exception as e:
+        logger.error("Error delivering webhook for ticket %s: %s", ticket_key, e)
+    finally:
+        with _dispatch_lock:
+            _dispatch_stats["pending"] -= 1
+            _dispatch_stats[outcome] += 1
+
 @app.route('/jira-webhook', methods=['POST'])
 def handle_jira_webhook():
     """Main JIRA webhook handler with routing"""
     try:
-        data = request.get_json()
+        data = _request_json()
         
         if not data:
-            return jsonify({"status": "error", "message": "No JSON data provided"}), 400
+            return _json({"status": "error", "message": "No JSON data provided"}, 400)
         
         webhook_event = data.get('webhookEvent', '')
-        issue = data.get('issue', {})
+        issue = data.get('issue')
         
         if not issue:
-            return jsonify({"status": "ignored", "message": "No issue data in webhook"}), 200
+            return _json({"status": "ignored", "message": "No issue data in webhook"}, 200)
         
         # Extract issue information
-        fields = issue.get('fields', {})
-        project = fields.get('project', {})
-        project_key = project.get('key', 'UNKNOWN')
+        fields = issue.get('fields') or _EMPTY
+        project_key = (fields.get('project') or _EMPTY).get('key', 'UNKNOWN')
         ticket_key = issue.get('key', 'UNKNOWN')
         
-        logger.info(f"Received webhook event: {webhook_event} for ticket: {ticket_key} (project: {project_key})")
+        logger.info("Received webhook event: %s for ticket: %s (project: %s)", webhook_event, ticket_key, project_key)
         
         # Find the appropriate route
         target_route = router.find_route_for_project(project_key)
         
         if not target_route:
-            logger.warning(f"No route found for project {project_key}, ignoring webhook")
-            return jsonify({
+            logger.warning("No route found for project %s, ignoring webhook", project_key)
+            return _json({
                 "status": "ignored", 
                 "message": f"No route configured for project: {project_key}"
-            }), 200
+            }, 200)
         
         # Determine the prompt template based on webhook event
+        webhook_event_lower = webhook_event.lower()
+        is_updated = 'updated' in webhook_event_lower
         template_key = 'issue_created'  # default
-        if 'updated' in webhook_event.lower():
+        if is_updated:
             template_key = 'issue_updated'
-        elif 'assigned' in webhook_event.lower():
+        elif 'assigned' in webhook_event_lower:
             template_key = 'issue_assigned'
         
         # Extract ticket information
+        assignee = fields.get('assignee')
         ticket_info = {
             'ticket_key': ticket_key,
             'project_key': project_key,
             'summary': fields.get('summary', ''),
             'description': fields.get('description', ''),
-            'priority': fields.get('priority', {}).get('name', 'None'),
-            'status': fields.get('status', {}).get('name', 'Unknown'),
-            'assignee': fields.get('assignee', {}).get('displayName', 'Unassigned') if fields.get('assignee') else 'Unassigned',
-            'ticket_url': f"{os.getenv('JIRA_BASE_URL', 'https://your-jira.atlassian.net')}/browse/{ticket_key}",
-            'changelog': _extract_changelog(data) if 'updated' in webhook_event.lower() else ''
+            'priority': (fields.get('priority') or _EMPTY).get('name', 'None'),
+            'status': (fields.get('status') or _EMPTY).get('name', 'Unknown'),
+            'assignee': assignee.get('displayName', 'Unassigned') if assignee else 'Unassigned',
+            'ticket_url': f"{JIRA_BASE_URL}/browse/{ticket_key}",
+            'changelog': _extract_changelog(data) if is_updated else ''
         }
         
         # Create prompt for Claude Code
-        prompt_template = CLAUDE_PROMPT_TEMPLATES.get(template_key, CLAUDE_PROMPT_TEMPLATES['issue_created'])
-        prompt = prompt_template.format(**ticket_info)
+        prompt = _render_template(_COMPILED_TEMPLATES[template_key], ticket_info)
         
-        # Send to Claude Code via AgentAPI
-        try:
-            response = requests.post(
-                f"{target_route.agentapi_url}/message",
-                json={
-                    "content": prompt,
-                    "type": "user"
-                },
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Successfully sent webhook to {target_route.name} for ticket {ticket_key}")
-                return jsonify({
-                    "status": "success", 
-                    "message": f"Routed to project: {target_route.name}",
-                    "ticket": ticket_key,
-                    "project": project_key,
-                    "route": target_route.name
-                })
-            else:
-                logger.error(f"Failed to send to AgentAPI: {response.status_code} - {response.text}")
-                return jsonify({
-                    "status": "error", 
-                    "message": f"Failed to send to Claude Code: {response.status_code}"
-                }), 500
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed to {target_route.agentapi_url}: {e}")
-            return jsonify({
-                "status": "error", 
-                "message": f"Failed to connect to AgentAPI: {str(e)}"
-            }), 500
+        # Drop repeats of a prompt already sent for this ticket in the last few seconds
+        dedup_key = (ticket_key, hashlib.blake2b(prompt.encode(), digest_size=16).digest())
+        with _recent_lock:
+            is_duplicate = dedup_key in _RECENT
+            # Re-inserting would reset the TTL and slide the window forward on every repeat
+            if not is_duplicate:
+                _RECENT[dedup_key] = True
+        
+        if is_duplicate:
+            logger.info("Skipping duplicate webhook for ticket %s", ticket_key)
+            with _dispatch_lock:
+                _dispatch_stats["deduped"] += 1
+            return _json({
+                "status": "deduped",
+                "message": "Identical prompt already sent recently",
+                "ticket": ticket_key,
+                "project": project_key,
+                "route": target_route.name
+            }, 200)
+        
+        # Hand delivery to a background worker; JIRA only needs a 2xx acknowledgement
+        with _dispatch_lock:
+            _dispatch_stats["pending"] += 1
+        _DISPATCH.submit(_deliver, target_route, prompt, ticket_key)
+        
+        return _json({
+            "status": "accepted",
+            "message": f"Routed to project: {target_route.name}",
+            "ticket": ticket_key,
+            "project": project_key,
+            "route": target_route.name
+        }, 202)
         
     except Exception as e:
-        logger.error(f"Error processing webhook: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        logger.error("Error processing webhook: %s", e)
+        return _json({"status": "error", "message": str(e)}, 500)
 
 @app.route('/trigger-claude', methods=['POST'])
 def trigger_claude_manual():
     """Manual endpoint to trigger Claude Code with custom prompts"""
     try:
-        data = request.get_json()
+        data = _request_json()
         prompt = data.get('prompt', '')
         project_name = data.get('project', '')
         
         if not prompt:
-            return jsonify({"error": "No prompt provided"}), 400
+            return _json({"error": "No prompt provided"}, 400)
         
         # Find route by project name or use catch-all
+        state = router.state
         target_route = None
         if project_name:
-            target_route = router.routes.get(project_name)
+            target_route = state.routes.get(project_name)
         
         if not target_route:
-            target_route = router.catch_all_route
+            target_route = state.catch_all_route
         
         if not target_route:
-            return jsonify({"error": "No route available"}), 400
+            return _json({"error": "No route available"}, 400)
         
-        response = requests.post(
-            f"{target_route.agentapi_url}/message",
-            json={"content": prompt, "type": "user"},
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
+        response = _post_message(target_route.agentapi_url, _envelope(prompt))
         
-        return jsonify({
+        return _json({
             "status": "success" if response.status_code == 200 else "error",
             "route": target_route.name,
             "claude_response": response.text
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return _json({"error": str(e)}, 500)
+
+def _probe_status(target):
+    """Query the AgentAPI status endpoint for a single route"""
+    name, url, namespace = target
+    try:
+        response = _get_status(url)
+        return name, {
+            "status": "online" if response.status_code == 200 else "error",
+            "response_code": response.status_code,
+            "namespace": namespace
+        }
+    except Exception as e:
+        return name, {
+            "status": "offline",
+            "error": str(e),
+            "namespace": namespace
+        }
 
 @app.route('/claude-status', methods=['GET'])
 def claude_status():
     """Check Claude Code status for all routes"""
+    state = router.state
     status_info = {}
+    targets = []
     
-    # Check all configured routes
-    for route in router.routes.values():
+    # Collect all configured routes to probe
+    for route in state.routes.values():
         if not route.enabled:
             status_info[route.name] = {"status": "disabled"}
             continue
-            
-        try:
-            response = requests.get(f"{route.agentapi_url}/status", timeout=10)
-            status_info[route.name] = {
-                "status": "online" if response.status_code == 200 else "error",
-                "response_code": response.status_code,
-                "namespace": route.namespace
-            }
-        except Exception as e:
-            status_info[route.name] = {
-                "status": "offline",
-                "error": str(e),
-                "namespace": route.namespace
-            }
+        targets.append((route.name, route.agentapi_url, route.namespace))
     
-    # Check catch-all route
-    if router.catch_all_route and router.catch_all_route.enabled:
-        try:
-            response = requests.get(f"{router.catch_all_route.agentapi_url}/status", timeout=10)
-            status_info["catch_all"] = {
-                "status": "online" if response.status_code == 200 else "error",
-                "response_code": response.status_code,
-                "namespace": router.catch_all_route.namespace
-            }
-        except Exception as e:
-            status_info["catch_all"] = {
-                "status": "offline",
-                "error": str(e),
-                "namespace": router.catch_all_route.namespace
-            }
+    # Include catch-all route
+    if state.catch_all_route and state.catch_all_route.enabled:
+        targets.append(("catch_all", state.catch_all_route.agentapi_url, state.catch_all_route.namespace))
     
-    return jsonify(status_info)
+    if not targets:
+        return _json(status_info)
+    
+    # Probe all AgentAPI instances concurrently so latency is bounded by the slowest route
+    max_workers = min(32, len(targets))
+    if USE_GEVENT:
+        results = Pool(max_workers).imap_unordered(_probe_status, targets)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_probe_status, targets))
+    
+    for name, info in results:
+        status_info[name] = info
+    
+    return _json(status_info)
 
 def _extract_changelog(webhook_data):
     """Extract meaningful changelog from webhook data"""
-    changelog = webhook_data.get('changelog', {})
-    items = changelog.get('items', [])
+    items = (webhook_data.get('changelog') or _EMPTY).get('items')
+    if not items:
+        return 'No specific changes detected'
     
-    changes = []
-    for item in items:
-        field = item.get('field', '')
-        from_val = item.get('fromString', 'None')
-        to_val = item.get('toString', 'None')
-        changes.append(f"- {field}: {from_val} → {to_val}")
-    
-    return '\n'.join(changes) if changes else 'No specific changes detected'
+    return '\n'.join(
+        f"- {item.get('field', '')}: {item.get('fromString', 'None')} → {item.get('toString', 'None')}"
+        for item in items
+    )
 
 if __name__ == '__main__':
-    port = int(os.getenv('PORT', 5000))
-    debug = os.getenv('DEBUG', 'false').lower() == 'true'
-    app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
+    if WATCH_CONFIG:
+        start_config_watcher(router)
+    
+    if USE_GEVENT:
+        from gevent.pywsgi import WSGIServer
+        app.debug = DEBUG
+        logger.info("Starting gevent WSGI server on port %s", PORT)
+        WSGIServer(('0.0.0.0', PORT), app).serve_forever()
+    else:
+        app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
\ No newline at end of file